@@ -1,7 +1,21 @@
+import io
 import os
+import re
+import ast
 import json
 import sys
-import requests
+import time
+import asyncio
+import hashlib
+import sqlite3
+import argparse
+import multiprocessing
+import httpx
+
+try:
+    import orjson
+except ImportError:  # optional faster parser, json is used when unavailable
+    orjson = None
 
 
 
@@ -11,43 +25,262 @@ OLLAMA_HOST = "http://host.docker.internal:11434"
 MODEL_NAME = "phi4-mini"
 REQUEST_TIMEOUT = 60  # seconds
 MAX_RETRIES = 1
+HTTP_RETRIES = 3  # transport-level retries for transient Ollama errors
+HTTP_RETRY_STATUSES = {502, 503, 504}
+HTTP_BACKOFF_FACTOR = 1.0  # seconds, doubled after every retry
+HTTP_BACKOFF_MAX = 10  # seconds
+WARMUP_TIMEOUT = 300  # seconds allowed for Ollama to load the model
+KEEP_ALIVE = "30m"  # how long Ollama keeps the model loaded after a request
+NUM_PREDICT = 512  # cap on generated tokens per response
+DEFAULT_CONCURRENCY = 4  # max in-flight LLM requests when OLLAMA_NUM_PARALLEL is unset or 0 (auto)
+EXEC_TIMEOUT = 10  # seconds allowed for generated code to run
+WORKER_START_TIMEOUT = 60  # seconds allowed for an execution worker process to start
+CACHE_FILENAME = ".llm_cache.sqlite"  # created inside the test cases directory by default
+CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+HTTP_HEADERS = {
+    "Connection": "keep-alive",
+    "Accept-Encoding": "gzip, deflate",  # responses are decompressed transparently by httpx
+    "User-Agent": "llm-tester/1.0"
+}
 
 
 
 # PROMPT TEMPLATES
 
-INITIAL_PROMPT_TEMPLATE = """{query}
+# Static instructions come first and the dynamic parts last, so Ollama can
+# reuse the KV cache of the shared prefix across every test case.
 
-Write a Python function that solves this problem. Your function should be errorproof and syntactically correct. 
+INITIAL_PROMPT_INSTRUCTIONS = """Write a Python function that solves the problem below. Your function should be errorproof and syntactically correct. 
 Return ONLY the function code, nothing else. 
 The function should accept one parameter and return a string result. 
 Be sure to avoid any extra text beyond the relevant python code in your response."""
 
-RETRY_PROMPT_TEMPLATE = """{query}
+RETRY_PROMPT_INSTRUCTIONS = """Write a corrected Python function for the problem below. Return ONLY the function code, nothing else.
+The function should accept one parameter and return a string result."""
+
 
-The previous code failed with this error: {error}
+def _initial_prompt(query):
+    """Build the first-attempt prompt for a problem"""
+    return f"{INITIAL_PROMPT_INSTRUCTIONS}\n\nProblem:\n{query}"
 
-Previous code was:
-{previous_code}
 
-Write a corrected Python function. Return ONLY the function code, nothing else.
-The function should accept one parameter and return a string result."""
+def _retry_prompt(query, error, previous_code):
+    """Build the retry prompt with the failed code and its error"""
+    return (
+        f"{RETRY_PROMPT_INSTRUCTIONS}\n\nProblem:\n{query}\n\n"
+        f"Previous code was:\n{previous_code}\n\n"
+        f"The previous code failed with this error: {error}"
+    )
+
+
+# Fenced markdown code block, optionally tagged as python
+_CODE_BLOCK_RE = re.compile(r"```(?:python)?\s*\n(.*?)```", re.DOTALL)
+
+
+# (compiled code, first function name) keyed by source hash (one cache per worker process)
+_code_cache = {}
+
+
+def _run_generated(code, test_input):
+    """Execute generated code in isolated namespace and return result (runs in a worker process)"""
+    try:
+        # Parse and compile each distinct snippet only once
+        code_hash = hashlib.blake2b(code.encode(), digest_size=16).hexdigest()
+        cached = _code_cache.get(code_hash)
+        if cached is None:
+            tree = ast.parse(code, "<generated>")
+            
+            # The first top-level function is the one under test
+            function_names = [
+                node.name for node in tree.body
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            ]
+            cached = (compile(tree, "<generated>", "exec"), function_names[0] if function_names else None)
+            _code_cache[code_hash] = cached
+        
+        compiled_code, function_name = cached
+        if function_name is None:
+            return None, "No callable function found in generated code"
+        
+        execution_namespace = {}
+        exec(compiled_code, execution_namespace)
+        target_function = execution_namespace[function_name]
+        
+        # Execute function with test input
+        result = target_function(test_input)
+        return str(result), None
+        
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+    except BaseException as e:
+        # sys.exit(), exit(), quit() or KeyboardInterrupt must not reach the tester's event loop
+        return None, repr(e)
+
+
+def _execution_worker(connection):
+    """Worker process loop: run (code, test_input) tasks from the pipe and send back (result, error)"""
+    connection.send(None)  # signal that the worker is ready
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        connection.send(_run_generated(*task))
+
+
+class ExecutionWorker:
+    """A persistent process that runs generated code, one snippet at a time"""
+    
+    # spawn, so workers never inherit locks held by the tester's threads
+    context = multiprocessing.get_context("spawn")
+    
+    def __init__(self):
+        """Start the worker process (readiness is awaited on the first run)"""
+        self.connection, child_connection = self.context.Pipe()
+        self.process = self.context.Process(target=_execution_worker, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.ready = False
+    
+    def run(self, code, test_input, timeout):
+        """Run a snippet and return (result, error)
+
+        Blocks, so call it from a thread. Raises TimeoutError if the snippet runs longer
+        than timeout and EOFError if the process died while running it.
+        """
+        if not self.ready:
+            if not self.connection.poll(WORKER_START_TIMEOUT):
+                raise RuntimeError("Execution worker failed to start")
+            self.connection.recv()
+            self.ready = True
+        
+        self.connection.send((code, test_input))
+        if not self.connection.poll(timeout):
+            raise TimeoutError
+        return self.connection.recv()
+    
+    def terminate(self):
+        """Kill the process, used when its snippet hung or crashed"""
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+    
+    def close(self):
+        """Let an idle worker exit on its own"""
+        self.connection.close()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class LLMResponseCache:
+    """Exact-match cache of LLM responses stored in a local SQLite file"""
+    
+    def __init__(self, path):
+        """Open (or create) the cache database at the given path"""
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL)"
+        )
+        self.connection.commit()
+    
+    def get(self, key):
+        """Return the cached response for a key, or None if missing or expired"""
+        row = self.connection.execute(
+            "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        response, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            return None
+        return response
+    
+    def set(self, key, response, ttl=None):
+        """Store a response, optionally expiring after ttl seconds"""
+        expires_at = time.time() + ttl if ttl is not None else None
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)",
+            (key, response, expires_at)
+        )
+        self.connection.commit()
+    
+    def close(self):
+        """Close the underlying database connection"""
+        self.connection.close()
 
 
 class LLMCodeTester:
     """Main class for testing LLM-generated code against test cases"""
     
-    def __init__(self, ollama_host=OLLAMA_HOST, model_name=MODEL_NAME):
-        """Initialize the LLM Code Tester with Ollama connection"""
+    def __init__(self, ollama_host=OLLAMA_HOST, model_name=MODEL_NAME, cache=None,
+                 concurrency=DEFAULT_CONCURRENCY):
+        """Initialize the LLM Code Tester with Ollama connection and optional response cache"""
         self.ollama_host = ollama_host
         self.model_name = model_name
         self.api_url = f"{ollama_host}/api/generate"
+        self.cache = cache
+        self.stats = {"hits": 0, "misses": 0}
+        
+        # Cached responses are only replayable if generation is deterministic
+        # num_ctx is left to Ollama: queries are unbounded and truncation would drop the leading instructions
+        self.options = {"num_predict": NUM_PREDICT}
+        if cache is not None:
+            self.options["temperature"] = 0
+        
+        # Cap in-flight requests at what Ollama serves in parallel, extra ones only queue and time out
+        self._sem = asyncio.Semaphore(concurrency)
+        self._model_loaded = False
+        self._warm_up_lock = asyncio.Lock()
+        
+        # Worker processes that run generated code outside the tester's interpreter
+        # Each worker runs one snippet at a time, so a hang or crash is always attributed to
+        # the snippet that caused it. Workers are started on demand and reused while healthy.
+        self.max_workers = os.cpu_count() or 1
+        self._idle_workers = []
+        self._execution_slots = asyncio.Semaphore(self.max_workers)
+        
+        # Pooled clients so concurrent requests share keep-alive connections. HTTP/2 is only
+        # negotiated over TLS (an https:// host, e.g. behind a proxy), plain http:// stays on HTTP/1.1
+        timeout = httpx.Timeout(REQUEST_TIMEOUT, connect=10.0)
+        limits = httpx.Limits(max_keepalive_connections=40, max_connections=100, keepalive_expiry=30.0)
+        
+        self.client = httpx.Client(
+            http2=True,
+            headers=HTTP_HEADERS,
+            timeout=timeout,
+            transport=httpx.HTTPTransport(retries=HTTP_RETRIES, http2=True, limits=limits)
+        )
+        
+        # Async client used to fan out generation requests concurrently
+        self.async_client = httpx.AsyncClient(
+            http2=True,
+            headers=HTTP_HEADERS,
+            timeout=timeout,
+            transport=httpx.AsyncHTTPTransport(retries=HTTP_RETRIES, http2=True, limits=limits)
+        )
+    
+    def close(self):
+        """Release pooled HTTP connections and the response cache"""
+        self.client.close()
+        while self._idle_workers:
+            self._idle_workers.pop().close()
+        if self.cache is not None:
+            self.cache.close()
+    
+    async def aclose(self):
+        """Release pooled HTTP connections, including the async client"""
+        self.close()
+        await self.async_client.aclose()
     
     def check_ollama_health(self):
         """Verify Ollama is accessible before starting tests"""
         try:
             health_url = f"{self.ollama_host}/api/tags"
-            response = requests.get(health_url, timeout=5)
+            response = self.client.get(health_url, timeout=5)
             response.raise_for_status()
             print("Ollama connection verified successfully\n")
             return True
@@ -57,118 +290,225 @@ class LLMCodeTester:
             print("Please ensure Ollama is running on your host machine.\n")
             return False
     
-    def call_ollama_api(self, prompt):
-        """Send a request to Ollama API and return the generated response"""
-        payload = {
+    async def warm_up_model(self):
+        """Load the model into Ollama's memory so the first test isn't charged for the model load"""
+        # Same options as real requests, load-time options that differ would make Ollama reload the model
+        payload = self._build_payload("")
+        
+        print(f"Loading model {self.model_name}...")
+        start = time.monotonic()
+        try:
+            response = await self.async_client.post(self.api_url, json=payload, timeout=WARMUP_TIMEOUT)
+            response.raise_for_status()
+            print(f"Model loaded in {time.monotonic() - start:.1f}s\n")
+        except httpx.HTTPError as e:
+            print(f"WARNING: Could not preload model {self.model_name}: {e}\n")
+    
+    async def _ensure_model_loaded(self):
+        """Warm the model up once, on the first request that actually reaches Ollama"""
+        if self._model_loaded:
+            return
+        
+        async with self._warm_up_lock:
+            if not self._model_loaded:
+                await self.warm_up_model()
+                # Failed warm-ups are not repeated, the requests themselves will surface the error
+                self._model_loaded = True
+    
+    def _build_payload(self, prompt):
+        """Build the /api/generate request body for a prompt"""
+        return {
             "model": self.model_name,
             "prompt": prompt,
-            "stream": False
+            "stream": False,
+            "keep_alive": KEEP_ALIVE,
+            "options": self.options
         }
+    
+    def _backoff_delay(self, attempt):
+        """Seconds to wait before retrying a request after the given attempt (0-based)"""
+        return min(HTTP_BACKOFF_FACTOR * 2 ** attempt, HTTP_BACKOFF_MAX)
+    
+    def _cache_key(self, prompt):
+        """Build the cache key for a prompt sent to the configured model with the current options"""
+        options = json.dumps(self.options, sort_keys=True)
+        return hashlib.sha256(f"{self.model_name}\0{options}\0{prompt}".encode()).hexdigest()
+    
+    def _get_cached_response(self, prompt):
+        """Look up a prompt in the response cache and record the hit or miss"""
+        if self.cache is None:
+            return None
         
         try:
-            response = requests.post(self.api_url, json=payload, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            return response.json()["response"]
-        except requests.exceptions.Timeout:
-            print(f"ERROR: Request to Ollama timed out after {REQUEST_TIMEOUT} seconds")
-            return None
-        except requests.exceptions.RequestException as e:
-            print(f"ERROR: Failed to call Ollama API: {e}")
+            cached = self.cache.get(self._cache_key(prompt))
+        except sqlite3.Error as e:
+            self._disable_cache(e)
             return None
+        
+        if cached is None:
+            self.stats["misses"] += 1
+        else:
+            self.stats["hits"] += 1
+        return cached
+    
+    def _store_cached_response(self, prompt, response):
+        """Save a successful LLM response in the cache"""
+        if self.cache is None:
+            return
+        
+        try:
+            self.cache.set(self._cache_key(prompt), response, ttl=CACHE_TTL)
+        except sqlite3.Error as e:
+            self._disable_cache(e)
+    
+    def _disable_cache(self, error):
+        """Warn about a cache failure and continue the run without caching"""
+        print(f"WARNING: Response cache at {self.cache.path} failed: {error}")
+        print("Continuing without caching.\n")
+        
+        try:
+            self.cache.close()
+        except sqlite3.Error:
+            pass
+        self.cache = None
+    
+    async def acall_ollama_api(self, prompt):
+        """Send a request to Ollama API and return (generated response, error)"""
+        cached = self._get_cached_response(prompt)
+        if cached is not None:
+            return cached, None
+        
+        # Fully cached runs never load the model
+        await self._ensure_model_loaded()
+        
+        payload = self._build_payload(prompt)
+        
+        try:
+            for attempt in range(HTTP_RETRIES + 1):
+                async with self._sem:
+                    response = await self.async_client.post(self.api_url, json=payload)
+                if response.status_code not in HTTP_RETRY_STATUSES or attempt == HTTP_RETRIES:
+                    break
+                await asyncio.sleep(self._backoff_delay(attempt))
+            response.raise_for_status()
+            llm_response = response.json()["response"]
+            self._store_cached_response(prompt, llm_response)
+            return llm_response, None
+        except httpx.TimeoutException:
+            return None, f"Request to Ollama timed out after {REQUEST_TIMEOUT} seconds"
+        except httpx.HTTPError as e:
+            return None, f"Failed to call Ollama API: {e}"
+        except (ValueError, KeyError) as e:
+            # Body was not JSON or had no "response" field
+            return None, f"Invalid response from Ollama API: {type(e).__name__}: {e}"
     
     def extract_python_code(self, llm_response):
         """Extract Python code from LLM response (handles markdown formatting)"""
         if not llm_response:
             return ""
         
-        # Try to find code between ```python and ```
-        if "```python" in llm_response:
-            start_marker = "```python"
-            start = llm_response.find(start_marker) + len(start_marker)
-            end = llm_response.find("```", start)
-            if end != -1:
-                return llm_response[start:end].strip()
-        
-        # Try to find code between ``` and ```
-        if "```" in llm_response:
-            start = llm_response.find("```") + 3
-            end = llm_response.find("```", start)
-            if end != -1:
-                return llm_response[start:end].strip()
-        
-        # Assume entire response is code
+        # Take the first fenced code block, otherwise assume entire response is code
+        match = _CODE_BLOCK_RE.search(llm_response)
+        if match:
+            return match.group(1).strip()
+        
         return llm_response.strip()
     
-    def execute_code_safely(self, code, test_input):
-        """Execute generated code in isolated namespace and return result"""
-        try:
-            execution_namespace = {}
-            exec(code, execution_namespace)
+    async def execute_code_safely(self, code, test_input):
+        """Execute generated code in a worker process and return result, killing it on timeout"""
+        async with self._execution_slots:
+            worker = self._idle_workers.pop() if self._idle_workers else None
+            if worker is None or not worker.process.is_alive():
+                # Replace a worker that died while idle instead of blaming the next snippet
+                if worker is not None:
+                    worker.terminate()
+                worker = ExecutionWorker()
             
-            # Find the first callable function defined in the code
-            target_function = None
-            for name, obj in execution_namespace.items():
-                if callable(obj) and not name.startswith('__'):
-                    target_function = obj
-                    break
-            
-            if target_function is None:
-                return None, "No callable function found in generated code"
+            try:
+                result = await asyncio.to_thread(worker.run, code, test_input, EXEC_TIMEOUT)
+            except TimeoutError:
+                worker.terminate()
+                return None, f"Execution timed out after {EXEC_TIMEOUT} seconds"
+            except (EOFError, OSError):
+                worker.terminate()
+                return None, f"Execution worker crashed (exit code {worker.process.exitcode})"
+            except RuntimeError as e:
+                worker.terminate()
+                return None, str(e)
             
-            # Execute function with test input
-            result = target_function(test_input)
-            return str(result), None
-            
-        except Exception as e:
-            return None, str(e)
+            self._idle_workers.append(worker)
+            return result
     
-    def generate_and_test_code(self, query, test_input):
-        """Generate code from LLM and test it, with retry on failure"""
-        # Initial attempt
-        prompt = INITIAL_PROMPT_TEMPLATE.format(query=query)
-        llm_response = self.call_ollama_api(prompt)
+    async def generate_and_test_batch(self, problems):
+        """Generate code for all problems in one batch, then retry the failures in a second batch"""
+        # Initial attempt: every prompt goes out at once, each problem is tested as its response arrives
+        await asyncio.gather(*(
+            self._generate_and_test(
+                problem, _initial_prompt(problem["query"]), "Failed to get response from LLM", final=False
+            )
+            for problem in problems
+        ))
+        
+        # Retry only the problems whose generated code failed
+        failed = [problem for problem in problems if self._needs_retry(problem)]
+        for problem in failed:
+            problem["retry_reason"] = problem["error"]
+        
+        await asyncio.gather(*(
+            self._generate_and_test(
+                problem,
+                _retry_prompt(problem["query"], problem["error"], problem["attempts"][-1]),
+                "Failed to get response from LLM on retry",
+                final=True
+            )
+            for problem in failed
+        ))
+    
+    def _needs_retry(self, problem):
+        """Check if a problem's generated code failed and should be regenerated with error feedback"""
+        return MAX_RETRIES > 0 and bool(problem["error"]) and bool(problem["attempts"])
+    
+    async def _generate_and_test(self, problem, prompt, missing_response_error, final):
+        """Run one attempt for a problem and print its report as soon as the outcome is final"""
+        try:
+            llm_response, error = await self.acall_ollama_api(prompt)
+        except Exception as e:
+            # An unexpected failure only costs the problem it belongs to
+            llm_response, error = None, f"Unexpected error calling Ollama API: {type(e).__name__}: {e}"
         
         if llm_response is None:
-            return None, None, "Failed to get response from LLM"
+            problem["error"] = f"{missing_response_error}: {error}"
+        else:
+            try:
+                await self._test_generated_code(problem, llm_response)
+            except Exception as e:
+                # Keep sibling problems (e.g. from the same multi-problem file) running
+                problem["result"], problem["error"] = None, f"Unexpected error executing code: {type(e).__name__}: {e}"
         
+        # Problems waiting for a retry are reported once it finishes
+        if final or not self._needs_retry(problem):
+            self._print_problem_report(problem)
+    
+    async def _test_generated_code(self, problem, llm_response):
+        """Extract code from an LLM response and run it against the problem's test input"""
         generated_code = self.extract_python_code(llm_response)
-        self._print_generated_code(generated_code, attempt=1)
+        problem["attempts"].append(generated_code)
         
         # Test execution
-        result, error = self.execute_code_safely(generated_code, test_input)
-        
-        # Retry if failed
-        if error and MAX_RETRIES > 0:
-            print(f"\nExecution Error: {error}")
-            print("Retrying with error feedback...\n")
-            
-            retry_prompt = RETRY_PROMPT_TEMPLATE.format(
-                query=query,
-                error=error,
-                previous_code=generated_code
-            )
-            
-            llm_response = self.call_ollama_api(retry_prompt)
-            if llm_response is None:
-                return generated_code, None, "Failed to get response from LLM on retry"
-            
-            generated_code = self.extract_python_code(llm_response)
-            self._print_generated_code(generated_code, attempt=2)
-            
-            result, error = self.execute_code_safely(generated_code, test_input)
-        
-        return generated_code, result, error
+        problem["result"], problem["error"] = await self.execute_code_safely(
+            generated_code, problem["test_input"]
+        )
     
-    def _print_generated_code(self, code, attempt=1):
+    def _print_generated_code(self, out, code, attempt=1):
         """Pretty print the generated code"""
         attempt_text = f" (Attempt {attempt})" if attempt > 1 else ""
-        print(f"\nGenerated Code{attempt_text}:")
-        print("-" * 80)
-        print(code)
-        print("-" * 80)
+        print(f"\nGenerated Code{attempt_text}:", file=out)
+        print("-" * 80, file=out)
+        print(code, file=out)
+        print("-" * 80, file=out)
     
-    def process_single_problem(self, problem_name, problem_data):
-        """Process and validate a single test case"""
+    def build_problem(self, problem_name, problem_data):
+        """Validate a single test case and return its problem record, or None if invalid"""
         query = problem_data.get("query")
         test_input = problem_data.get("test_input")
         expected_output = problem_data.get("test_output")
@@ -176,95 +516,131 @@ class LLMCodeTester:
         # Validate problem data
         if not all([query, test_input is not None, expected_output is not None]):
             print(f"ERROR: Invalid problem data for {problem_name}\n")
-            return
+            return None
+        
+        return {
+            "name": problem_name,
+            "query": query,
+            "test_input": test_input,
+            "expected_output": expected_output,
+            "attempts": [],
+            "retry_reason": None,
+            "result": None,
+            "error": None
+        }
+    
+    def _print_problem_report(self, problem):
+        """Print the header, generated code and results for a finished problem in a single write
+
+        Must be called from the event-loop thread, never from a worker thread.
+        """
+        out = io.StringIO()
+        self._print_test_header(
+            out, problem["name"], problem["query"], problem["test_input"], problem["expected_output"]
+        )
         
-        # Print test case info
-        self._print_test_header(problem_name, query, test_input, expected_output)
+        for attempt, code in enumerate(problem["attempts"], start=1):
+            self._print_generated_code(out, code, attempt=attempt)
+            if attempt == 1 and problem["retry_reason"]:
+                print(f"\nExecution Error: {problem['retry_reason']}", file=out)
+                print("Retrying with error feedback...\n", file=out)
         
-        # Generate and test code
-        code, actual_output, error = self.generate_and_test_code(query, test_input)
+        self._print_test_results(out, problem["result"], problem["expected_output"], problem["error"])
         
-        # Print results
-        self._print_test_results(actual_output, expected_output, error)
+        # Reports are emitted from concurrent tasks, but always on the event-loop thread and with
+        # no await between building and writing, so each block lands whole without a lock
+        sys.stdout.write(out.getvalue())
+        sys.stdout.flush()
     
-    def _print_test_header(self, problem_name, query, test_input, expected_output):
+    def _print_test_header(self, out, problem_name, query, test_input, expected_output):
         """Print formatted test case header"""
-        print(f"\n{'='*80}")
-        print(f"Testing Problem: {problem_name}")
-        print(f"{'='*80}")
-        print(f"Query: {query}")
-        print(f"Test Input: {test_input}")
-        print(f"Expected Output: {expected_output}")
-        print(f"\n{'='*80}")
-        print("Calling LLM to generate code...")
+        print(f"\n{'='*80}", file=out)
+        print(f"Testing Problem: {problem_name}", file=out)
+        print(f"{'='*80}", file=out)
+        print(f"Query: {query}", file=out)
+        print(f"Test Input: {test_input}", file=out)
+        print(f"Expected Output: {expected_output}", file=out)
+        print(f"\n{'='*80}", file=out)
     
-    def _print_test_results(self, actual_output, expected_output, error):
+    def _print_test_results(self, out, actual_output, expected_output, error):
         """Print formatted test results"""
         if error:
-            print(f"\nFinal Error: {error}")
-            print("Result: FAILED (Could not execute code)\n")
+            print(f"\nFinal Error: {error}", file=out)
+            print("Result: FAILED (Could not execute code)\n", file=out)
         elif actual_output == str(expected_output):
-            print(f"\nActual Output: {actual_output}")
-            print("Result: PASSED ✓\n")
+            print(f"\nActual Output: {actual_output}", file=out)
+            print("Result: PASSED ✓\n", file=out)
         else:
-            print(f"\nActual Output: {actual_output}")
-            print(f"Expected Output: {expected_output}")
-            print("Result: FAILED (Output mismatch)\n")
+            print(f"\nActual Output: {actual_output}", file=out)
+            print(f"Expected Output: {expected_output}", file=out)
+            print("Result: FAILED (Output mismatch)\n", file=out)
     
-    def process_json_file(self, file_path):
-        """Load and process a JSON file (supports both single and multiple problem formats)"""
+    def load_json_file(self, file_path):
+        """Load a JSON file and return its problems (supports both single and multiple problem formats)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
+            with open(file_path, 'rb') as file:
+                raw = file.read()
+            data = orjson.loads(raw) if orjson else json.loads(raw)
             
-            # Detect format and process accordingly
+            # Detect format and load accordingly
             if self._is_single_problem_format(data):
                 problem_name = os.path.basename(file_path).replace('.json', '')
-                self.process_single_problem(problem_name, data)
-            else:
-                self._process_multiple_problems(data)
+                problem = self.build_problem(problem_name, data)
+                return [problem] if problem else []
+            return self._load_multiple_problems(data)
         
         except json.JSONDecodeError as e:
             print(f"ERROR: Invalid JSON in {file_path}: {e}\n")
         except Exception as e:
             print(f"ERROR: Failed to process {file_path}: {e}\n")
+        return []
     
     def _is_single_problem_format(self, data):
         """Check if JSON follows single problem format"""
         required_keys = {"query", "test_input", "test_output"}
         return required_keys.issubset(data.keys())
     
-    def _process_multiple_problems(self, data):
-        """Process multiple problems from a single JSON file"""
+    def _load_multiple_problems(self, data):
+        """Load multiple problems from a single JSON file"""
+        problems = []
         for problem_key, problem_data in data.items():
             if isinstance(problem_data, dict):
-                self.process_single_problem(problem_key, problem_data)
+                problem = self.build_problem(problem_key, problem_data)
+                if problem:
+                    problems.append(problem)
+        return problems
     
-    def run(self, test_cases_directory):
+    async def run(self, test_cases_directory):
         """Main entry point - discover and process all JSON test files"""
         # Print startup info
         self._print_startup_info(test_cases_directory)
         
-        # Verify Ollama connectivity
-        if not self.check_ollama_health():
-            sys.exit(1)
-        
-        # Discover JSON files
-        json_files = self._discover_json_files(test_cases_directory)
-        
-        if not json_files:
-            print(f"WARNING: No JSON files found in {test_cases_directory}\n")
-            return
-        
-        print(f"Found {len(json_files)} JSON file(s)\n")
-        
-        # Process each file
-        for json_file in sorted(json_files):
-            file_path = os.path.join(test_cases_directory, json_file)
-            self.process_json_file(file_path)
-        
-        # Print completion message
-        self._print_completion_message()
+        try:
+            # Verify Ollama connectivity
+            if not self.check_ollama_health():
+                sys.exit(1)
+            
+            # Discover JSON files
+            json_files = self._discover_json_files(test_cases_directory)
+            
+            if not json_files:
+                print(f"WARNING: No JSON files found in {test_cases_directory}\n")
+                return
+            
+            print(f"Found {len(json_files)} JSON file(s)\n")
+            
+            # Collect every problem up front so prompts can be batched
+            problems = []
+            for json_file in sorted(json_files):
+                problems.extend(self.load_json_file(os.path.join(test_cases_directory, json_file)))
+            
+            print(f"Generating code for {len(problems)} problem(s)...")
+            await self.generate_and_test_batch(problems)
+            
+            # Print completion message
+            self._print_completion_message()
+        finally:
+            await self.aclose()
     
     def _print_startup_info(self, test_cases_directory):
         """Print application startup information"""
@@ -276,8 +652,8 @@ class LLMCodeTester:
     def _discover_json_files(self, directory):
         """Find all JSON files in the specified directory"""
         try:
-            all_files = os.listdir(directory)
-            return [f for f in all_files if f.endswith('.json')]
+            with os.scandir(directory) as entries:
+                return [e.name for e in entries if e.is_file() and e.name.endswith('.json')]
         except Exception as e:
             print(f"ERROR: Cannot read directory {directory}: {e}")
             return []
@@ -286,17 +662,49 @@ class LLMCodeTester:
         """Print test completion message"""
         print(f"{'='*80}")
         print("All tests completed!")
+        if self.cache is not None:
+            print(f"Response cache: {self.stats['hits']} hit(s), {self.stats['misses']} miss(es)")
         print(f"{'='*80}\n")
 
 
+def _concurrency_from_env():
+    """Read the default concurrency from OLLAMA_NUM_PARALLEL, exiting on an invalid value"""
+    value = os.environ.get("OLLAMA_NUM_PARALLEL", "").strip()
+    if not value:
+        return DEFAULT_CONCURRENCY
+    
+    try:
+        concurrency = int(value)
+    except ValueError:
+        concurrency = -1
+    
+    if concurrency < 0:
+        print(f"ERROR: OLLAMA_NUM_PARALLEL must be a non-negative integer, got {value!r}")
+        sys.exit(1)
+    
+    # 0 is Ollama's "auto" setting, so fall back to the default
+    return concurrency or DEFAULT_CONCURRENCY
+
+
 def main():
     """Application entry point"""
-    if len(sys.argv) != 2:
-        print("Usage: python app.py <test_cases_directory>")
-        print("Example: python app.py /test_cases")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Test LLM-generated code against JSON test cases",
+        epilog="Example: python app.py /test_cases"
+    )
+    parser.add_argument("test_cases_directory", help="directory containing JSON test case files")
+    parser.add_argument("--concurrency", type=int,
+                        help=f"max concurrent LLM requests (default: $OLLAMA_NUM_PARALLEL or {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--no-cache", action="store_true", help="always call the LLM, ignoring cached responses")
+    parser.add_argument("--cache-path", help=f"response cache file (default: <test_cases_directory>/{CACHE_FILENAME})")
+    args = parser.parse_args()
     
-    test_cases_directory = sys.argv[1]
+    if args.concurrency is None:
+        args.concurrency = _concurrency_from_env()
+    elif args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    
+    test_cases_directory = args.test_cases_directory
     
     if not os.path.exists(test_cases_directory):
         print(f"ERROR: Directory not found: {test_cases_directory}")
@@ -306,9 +714,19 @@ def main():
         print(f"ERROR: Path is not a directory: {test_cases_directory}")
         sys.exit(1)
     
+    # Open the response cache, falling back to uncached runs if it is unavailable
+    cache = None
+    if not args.no_cache:
+        cache_path = args.cache_path or os.path.join(test_cases_directory, CACHE_FILENAME)
+        try:
+            cache = LLMResponseCache(cache_path)
+        except sqlite3.Error as e:
+            print(f"WARNING: Cannot open response cache at {cache_path}: {e}")
+            print("Continuing without caching.\n")
+    
     # Initialize and run tester
-    tester = LLMCodeTester()
-    tester.run(test_cases_directory)
+    tester = LLMCodeTester(cache=cache, concurrency=args.concurrency)
+    asyncio.run(tester.run(test_cases_directory))
 
 
 if __name__ == "__main__":